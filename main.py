@@ -1,11 +1,20 @@
 """Main entry point for action-items CLI."""
 
+import sys
 from datetime import datetime
 
 import click
 
-from src.email import fetch_emails
-from src.utils import get_last_run, reset_last_run, save_last_run
+from src.utils import (
+    TIMESTAMP_FORMAT,
+    get_last_history_id,
+    get_last_run,
+    reset_last_run,
+    save_last_run,
+)
+
+# Format for --since and date prompts
+DATE_FORMAT = "%Y-%m-%d"
 
 
 @click.group()
@@ -22,7 +31,7 @@ def cli():
 )
 @click.option(
     "--since",
-    type=click.DateTime(formats=["%Y-%m-%d"]),
+    type=click.DateTime(formats=[DATE_FORMAT]),
     help="Fetch emails since specific date (YYYY-MM-DD)",
 )
 @click.option(
@@ -40,7 +49,7 @@ def cli():
 @click.option(
     "--interactive/--no-interactive",
     default=True,
-    help="Use interactive mode for missing options",
+    help="Use interactive mode for missing options (disabled when stdin is not a TTY)",
 )
 def fetch(days, since, unread_only, max_results, interactive):
     """Fetch emails from Gmail.
@@ -48,6 +57,16 @@ def fetch(days, since, unread_only, max_results, interactive):
     By default, uses incremental mode (fetches since last run).
     Use --days or --since to override.
     """
+    # Deferred so that commands which never touch Gmail skip the Google client imports
+    from src.email import fetch_emails, get_current_history_id
+
+    # Prompts would block on piped/cron stdin, so fall back to non-interactive mode
+    if interactive and not sys.stdin.isatty():
+        interactive = False
+
+    # Taken once, before any prompts, so mail arriving meanwhile is not skipped next run
+    current_run = datetime.now()
+
     print("=" * 70)
     print("📬 Action Items - Email Fetcher")
     print("=" * 70)
@@ -55,6 +74,7 @@ def fetch(days, since, unread_only, max_results, interactive):
     try:
         # Track if we should save state (for incremental mode)
         save_state = False
+        start_history_id = None
 
         # Interactive mode if no arguments provided
         if interactive and not days and not since:
@@ -63,7 +83,7 @@ def fetch(days, since, unread_only, max_results, interactive):
 
             last_run = get_last_run()
             if last_run:
-                print(f"\n⏱️  Last run: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                print(f"\n⏱️  Last run: {last_run.strftime(TIMESTAMP_FORMAT)}")
                 choice = click.prompt(
                     "\nHow would you like to fetch emails?"
                     + "\n1) Since last run (incremental)"
@@ -79,6 +99,7 @@ def fetch(days, since, unread_only, max_results, interactive):
                 if choice == "1":
                     print("\n📅 Fetching emails since last run...")
                     since = last_run
+                    start_history_id = get_last_history_id()
                     save_state = True
                 elif choice == "2":
                     days = click.prompt("How many days back?", type=int, default=7)
@@ -87,7 +108,7 @@ def fetch(days, since, unread_only, max_results, interactive):
                         "Enter start date (YYYY-MM-DD)",
                         type=str,
                     )
-                    since = datetime.strptime(date_str, "%Y-%m-%d")
+                    since = datetime.strptime(date_str, DATE_FORMAT)
             else:
                 print("\n🆕 First run detected!")
                 days = click.prompt(
@@ -107,53 +128,90 @@ def fetch(days, since, unread_only, max_results, interactive):
             if not days and not since:
                 save_state = True
 
-        # Determine fetch strategy
-        current_run = datetime.now()
+        # Capture the history ID before fetching so that mail arriving
+        # mid-fetch is picked up by the next incremental run
+        history_id = get_current_history_id() if save_state else None
 
+        # Determine fetch strategy
         if days:
             print(f"\n📅 Fetching emails from last {days} days...\n")
             emails = fetch_emails(
-                days=days, unread_only=unread_only, max_results=max_results
+                days=days,
+                unread_only=unread_only,
+                max_results=max_results,
+                fetch_body=False,
             )
         elif since:
-            print(f"\n📅 Fetching emails since {since.strftime('%Y-%m-%d')}...\n")
+            print(f"\n📅 Fetching emails since {since.strftime(DATE_FORMAT)}...\n")
             emails = fetch_emails(
-                after=since, unread_only=unread_only, max_results=max_results
+                after=since,
+                unread_only=unread_only,
+                max_results=max_results,
+                fetch_body=False,
+                start_history_id=start_history_id,
             )
         else:
             # Incremental mode
             last_run = get_last_run()
             if last_run:
-                print(f"\n⏱️  Last run: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                print(f"\n⏱️  Last run: {last_run.strftime(TIMESTAMP_FORMAT)}")
                 print("📅 Fetching emails since last run...\n")
                 emails = fetch_emails(
-                    after=last_run, unread_only=unread_only, max_results=max_results
+                    after=last_run,
+                    unread_only=unread_only,
+                    max_results=max_results,
+                    fetch_body=False,
+                    start_history_id=get_last_history_id(),
                 )
             else:
                 print("\n🆕 First run - fetching last 7 days...\n")
                 emails = fetch_emails(
-                    days=7, unread_only=unread_only, max_results=max_results
+                    days=7,
+                    unread_only=unread_only,
+                    max_results=max_results,
+                    fetch_body=False,
                 )
 
-        # Display results
-        if not emails:
+        # Display results as each batch arrives; the header goes out with the first email
+        count = 0
+        for count, email in enumerate(emails, 1):
+            if count == 1:
+                print("-" * 70)
+            sys.stdout.write(
+                f"\n[{count}] {email.subject}\n"
+                f"    From: {email.sender} <{email.sender_email}>\n"
+                f"    Date: {email.date.strftime(TIMESTAMP_FORMAT)}\n"
+                f"    Preview: {email.snippet[:100]}...\n"
+            )
+            sys.stdout.flush()
+
+        if not count:
             print("✓ No emails found!")
         else:
-            print(f"\n✓ Found {len(emails)} email(s)")
-            print("-" * 70)
-
-            for i, email in enumerate(emails, 1):
-                print(f"\n[{i}] {email.subject}")
-                print(f"    From: {email.sender} <{email.sender_email}>")
-                print(f"    Date: {email.date.strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"    Preview: {email.snippet[:100]}...")
-
             print("\n" + "-" * 70)
+            print(f"\n✓ Found {count} email(s)")
+
+        # Hitting --max may leave matching mail unshown
+        if count >= max_results:
+            if email.history_id:
+                # History is replayed oldest first; resume after the last email shown
+                print(
+                    f"\n⚠️  Reached --max {max_results}; "
+                    "the next run continues after the last email shown"
+                )
+                history_id = email.history_id
+                # Keep the old timestamp so a date-query fallback covers the rest
+                current_run = get_last_run() or current_run
+            else:
+                print(
+                    f"\n⚠️  Reached --max {max_results}; "
+                    "older matching emails, if any, were skipped"
+                )
 
         # Save timestamp if in incremental mode
         if save_state:
             print()
-            save_last_run(current_run)
+            save_last_run(current_run, history_id)
 
     except FileNotFoundError as e:
         click.echo(f"\n✗ Error: {e}", err=True)
@@ -194,7 +252,7 @@ def status():
     last_run = get_last_run()
 
     if last_run:
-        print(f"\n⏱️  Last run: {last_run.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"\n⏱️  Last run: {last_run.strftime(TIMESTAMP_FORMAT)}")
 
         # Calculate time since last run
         time_diff = datetime.now() - last_run
@@ -4,26 +4,43 @@ This module handles the OAuth2 authentication flow for accessing Gmail API.
 It manages token storage, refresh, and provides authenticated credentials.
 """
 
+import json
 import logging
 import os
-import pickle
+import sys
+from functools import cache
 from glob import glob
 from typing import Optional
 
-from dotenv import load_dotenv
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 
-# Load environment variables
-load_dotenv()
+# googleapiclient, google_auth_oauthlib and dotenv are imported where they are
+# used; they are slow to import and most CLI commands never need them.
 
 # Gmail API scopes - modify read-only to full access if needed
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-# File paths for credentials and tokens
-TOKEN_FILE = os.getenv("TOKEN_FILE", "token.json")
+# Default token path, overridable with the TOKEN_FILE environment variable
+DEFAULT_TOKEN_FILE = "token.json"
+
+
+@cache
+def load_environment() -> None:
+    """Load environment variables from .env (only once per process)."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_token_file() -> str:
+    """Get the path of the token file.
+
+    Returns:
+        str: TOKEN_FILE environment variable, or token.json by default
+    """
+    load_environment()
+    return os.getenv("TOKEN_FILE", DEFAULT_TOKEN_FILE)
 
 
 def find_credentials_file() -> str:
@@ -40,6 +57,7 @@ def find_credentials_file() -> str:
         FileNotFoundError: If no credentials file is found
     """
     # Check environment variable first
+    load_environment()
     env_creds = os.getenv("CREDENTIALS_FILE")
     if env_creds and os.path.exists(env_creds):
         return env_creds
@@ -57,6 +75,7 @@ def find_credentials_file() -> str:
     )
 
 
+@cache
 def get_credentials() -> Credentials:
     """Get valid Gmail API credentials.
     ref: https://developers.google.com/workspace/admin/directory/v1/quickstart/python?hl=en
@@ -66,18 +85,33 @@ def get_credentials() -> Credentials:
     2. Refreshes expired credentials if possible
     3. Initiates new OAuth flow if no valid credentials exist
 
+    The result is cached for the rest of the process; google-auth refreshes
+    the cached credentials in place when they expire.
+
     Returns:
         Credentials: Valid Google OAuth2 credentials
 
     Raises:
         FileNotFoundError: If credentials file doesn't exist
+        RuntimeError: If the token file is unreadable and stdin is not a TTY
     """
     creds: Optional[Credentials] = None
+    token_file = get_token_file()
 
     # Load existing credentials from token file
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, "rb") as token:
-            creds = pickle.load(token)
+    if os.path.exists(token_file):
+        try:
+            with open(token_file, "r") as token:
+                creds = Credentials.from_authorized_user_info(json.load(token), SCOPES)
+        except ValueError:
+            # Unreadable or legacy pickled token. The OAuth flow waits for a
+            # browser, which would hang cron and piped runs, so fail fast there.
+            if not sys.stdin.isatty():
+                raise RuntimeError(
+                    f"Token file {token_file} could not be read (it may be from an older version).\n"
+                    f"Delete {token_file} and run 'python main.py fetch' from a terminal to re-authenticate."
+                )
+            logging.warning("Ignoring invalid token file %s, re-authenticating", token_file)
 
     # Check if credentials are valid or can be refreshed
     if not creds or not creds.valid:
@@ -93,27 +127,53 @@ def get_credentials() -> Credentials:
             print("Starting OAuth2 authentication flow...")
             print("A browser window will open for you to authorize the application.")
 
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
             creds = flow.run_local_server(port=0)
 
             print("Authentication successful!")
 
         # Save credentials for future runs
-        with open(TOKEN_FILE, "wb") as token:
-            pickle.dump(creds, token)
-            print(f"Credentials saved to {TOKEN_FILE}")
+        with open(token_file, "w") as token:
+            token.write(creds.to_json())
+            print(f"Credentials saved to {token_file}")
 
     return creds
 
 
+def build_gmail_service(creds: Credentials):
+    """Build a Gmail API service from existing credentials.
+
+    Each service owns its own HTTP connection, which is not thread-safe,
+    so concurrent callers should build one service per thread.
+
+    Args:
+        creds: Valid Google OAuth2 credentials
+
+    Returns:
+        googleapiclient.discovery.Resource: Authenticated Gmail API service
+    """
+    from googleapiclient.discovery import build
+
+    # Use the discovery document bundled with googleapiclient instead of
+    # downloading it on every run; the runtime cache is then unnecessary
+    return build("gmail", "v1", credentials=creds, static_discovery=True, cache_discovery=False)
+
+
+@cache
 def get_gmail_service():
     """Create and return an authenticated Gmail API service.
 
+    The service is created once per process and reused, so repeated calls
+    share one authenticated HTTP connection. It must only be used from one
+    thread at a time; use build_gmail_service for worker threads.
+
     Returns:
         googleapiclient.discovery.Resource: Authenticated Gmail API service
     """
     creds = get_credentials()
-    service = build("gmail", "v1", credentials=creds)
+    service = build_gmail_service(creds)
     return service
 
 
@@ -122,8 +182,13 @@ def revoke_credentials() -> None:
 
     This is useful for testing or when you need to re-authenticate.
     """
-    if os.path.exists(TOKEN_FILE):
-        os.remove(TOKEN_FILE)
-        print(f"Removed {TOKEN_FILE}")
+    # Drop cached credentials and service so the next call re-authenticates
+    get_credentials.cache_clear()
+    get_gmail_service.cache_clear()
+
+    token_file = get_token_file()
+    if os.path.exists(token_file):
+        os.remove(token_file)
+        print(f"Removed {token_file}")
     else:
-        print(f"No token file found at {TOKEN_FILE}")
+        print(f"No token file found at {token_file}")
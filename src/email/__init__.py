@@ -1,6 +1,6 @@
 """Email module for Gmail integration."""
 
-from src.email.gmail_client import fetch_emails
+from src.email.gmail_client import fetch_emails, get_current_history_id
 from src.email.models import Email
 
-__all__ = ["fetch_emails", "Email"]
+__all__ = ["fetch_emails", "get_current_history_id", "Email"]
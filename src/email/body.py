@@ -0,0 +1,41 @@
+"""Decoding of Gmail message bodies."""
+
+import base64
+
+
+def get_email_body(payload: dict) -> str:
+    """Extract email body from Gmail message payload.
+
+    Args:
+        payload: Gmail message payload
+
+    Returns:
+        Email body text (plain text preferred, HTML if no plain text)
+    """
+    # Single-part message: the payload itself carries the body
+    data = payload.get("body", {}).get("data")
+
+    if not data:
+        # Walk the MIME tree depth-first, in document order, recording the raw
+        # data of the first plain and HTML parts; only the winner is decoded
+        plain_data = html_data = None
+        stack = list(reversed(payload.get("parts", [])))
+        while stack:
+            part = stack.pop()
+            part_data = part.get("body", {}).get("data")
+            mime_type = part.get("mimeType", "")
+
+            if part_data and mime_type == "text/plain":
+                plain_data = part_data
+                break  # Plain text is preferred, no need to look further
+            if part_data and mime_type == "text/html" and html_data is None:
+                html_data = part_data
+
+            stack.extend(reversed(part.get("parts", [])))
+
+        data = plain_data or html_data
+
+    if not data:
+        return ""
+
+    return base64.urlsafe_b64decode(data).decode("utf-8", errors="replace")
@@ -1,30 +1,74 @@
 """Gmail API client for fetching and managing emails."""
 
-import base64
 import html
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from email.utils import parsedate_to_datetime
+from email.header import decode_header, make_header
+from email.utils import parseaddr, parsedate_to_datetime
 from typing import Optional
 
-from src.auth.gmail_auth import get_gmail_service
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+
+from src.auth.gmail_auth import build_gmail_service, get_credentials, get_gmail_service
 from src.email.models import Email
 
+# Gmail accepts up to 100 calls per batch request, but recommends at most 50
+BATCH_SIZE = 50
+
+# Date format understood by Gmail's after:/before: search operators
+QUERY_DATE_FORMAT = "%Y/%m/%d"
+
+# Largest page size accepted by messages().list()
+MAX_PAGE_SIZE = 500
+
+# Headers needed to build an Email when the body is not requested
+METADATA_HEADERS = ["Subject", "From", "To", "Date"]
+
+# Partial response mask for metadata fetches: only what parse_message reads
+METADATA_FIELDS = "id,threadId,snippet,labelIds,payload/headers"
+
+# messages().list() leaves these out by default; history().list() does not
+EXCLUDED_LABELS = {"SPAM", "TRASH"}
+
+# Each messages.get costs 5 quota units against Gmail's 250 units/s per-user
+# limit, so a single 50-message batch already uses about a second of quota.
+# Keep concurrency low and retry throttled sub-requests rather than fail.
+MAX_WORKERS = 2
+
+# Retries for throttled (429/403 rate limit) or failed (5xx) sub-requests
+MAX_RETRIES = 5
+
+# Error reasons Gmail uses for rate limiting on 403 responses, both in the
+# legacy "errors" list and in the newer google.rpc "details" list
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "RATE_LIMIT_EXCEEDED"}
+
+# Base delay in seconds for exponential backoff between retries
+RETRY_BASE_DELAY = 1.0
+
 
 def build_query(
     after: Optional[datetime] = None,
     before: Optional[datetime] = None,
     days: Optional[int] = None,
     unread_only: bool = True,
-    labels: Optional[list[str]] = None,
 ) -> str:
     """Build Gmail API query string from filters.
 
+    Labels are not part of the query; they are passed to messages().list()
+    as labelIds, which Gmail matches against its label index.
+
     Args:
         after: Fetch emails after this date
         before: Fetch emails before this date
         days: Fetch emails from last N days (alternative to after/before)
         unread_only: Only fetch unread emails
-        labels: Filter by Gmail labels (e.g., ['INBOX', 'IMPORTANT'])
 
     Returns:
         Gmail API query string
@@ -33,8 +77,8 @@ def build_query(
         >>> build_query(days=7, unread_only=True)
         'is:unread after:2025/09/29'
 
-        >>> build_query(after=datetime(2025, 10, 1), labels=['INBOX'])
-        'is:unread label:INBOX after:2025/10/01'
+        >>> build_query(after=datetime(2025, 10, 1))
+        'is:unread after:2025/10/01'
     """
     query_parts = []
 
@@ -46,17 +90,12 @@ def build_query(
     if days:
         # Calculate date N days ago
         target_date = datetime.now() - timedelta(days=days)
-        query_parts.append(f"after:{target_date.strftime('%Y/%m/%d')}")
+        query_parts.append(f"after:{target_date.strftime(QUERY_DATE_FORMAT)}")
     else:
         if after:
-            query_parts.append(f"after:{after.strftime('%Y/%m/%d')}")
+            query_parts.append(f"after:{after.strftime(QUERY_DATE_FORMAT)}")
         if before:
-            query_parts.append(f"before:{before.strftime('%Y/%m/%d')}")
-
-    # Label filters
-    if labels:
-        for label in labels:
-            query_parts.append(f"label:{label}")
+            query_parts.append(f"before:{before.strftime(QUERY_DATE_FORMAT)}")
 
     return " ".join(query_parts)
 
@@ -64,11 +103,13 @@ def build_query(
 def parse_email_address(header: str) -> tuple[str, str]:
     """Parse email header into name and email address.
 
+    Handles quoted display names, comments and RFC 2047 encoded words.
+
     Args:
         header: Email header string (e.g., "John Doe <john@example.com>")
 
     Returns:
-        Tuple of (name, email_address)
+        Tuple of (name, email_address); name falls back to the address
 
     Examples:
         >>> parse_email_address("John Doe <john@example.com>")
@@ -77,70 +118,340 @@ def parse_email_address(header: str) -> tuple[str, str]:
         >>> parse_email_address("jane@example.com")
         ('jane@example.com', 'jane@example.com')
     """
-    if "<" in header and ">" in header:
-        # Format: "Name <email@example.com>"
+    name, email = parseaddr(header)
+
+    # parseaddr gives up on unquoted display names with commas ("Doe, John <...>")
+    if "@" not in email and "<" in header and ">" in header:
         name = header.split("<")[0].strip().strip('"')
         email = header.split("<")[1].split(">")[0].strip()
-        return name, email
-    else:
-        # Just email address
-        email = header.strip()
-        return email, email
+
+    # Decode encoded words such as "=?UTF-8?B?...?=" in the display name
+    if "=?" in name:
+        try:
+            name = str(make_header(decode_header(name)))
+        except (LookupError, UnicodeDecodeError):
+            pass  # Malformed encoded word - keep the raw name
+
+    return name or email, email
 
 
-def get_header_value(headers: list[dict], name: str) -> str:
-    """Extract header value by name from Gmail headers list.
+def index_headers(headers: list[dict]) -> dict[str, str]:
+    """Index Gmail headers by lowercased name for O(1) lookups.
 
     Args:
         headers: List of Gmail header dicts
-        name: Header name to find (case-insensitive)
 
     Returns:
-        Header value or empty string if not found
+        Dict mapping lowercased header name to value; when a header
+        appears more than once, the first occurrence wins
+    """
+    return {header["name"].lower(): header["value"] for header in reversed(headers)}
+
+
+def parse_message(msg_data: dict) -> Email:
+    """Build an Email from a Gmail message resource.
+
+    The body is not decoded here; Email.body does that lazily from the payload.
+
+    Args:
+        msg_data: Gmail message resource as returned by messages().get()
+
+    Returns:
+        Parsed Email object
+    """
+    # Parse headers
+    headers = index_headers(msg_data["payload"]["headers"])
+    subject = headers.get("subject", "")
+    from_header = headers.get("from", "")
+    to_header = headers.get("to", "")
+    date_header = headers.get("date", "")
+
+    # Parse sender info
+    sender_name, sender_email = parse_email_address(from_header)
+
+    # Parse date
+    date = parsedate_to_datetime(date_header) if date_header else datetime.now()
+
+    # Decode HTML entities in the snippet
+    snippet = html.unescape(msg_data.get("snippet", ""))
+
+    return Email(
+        id=msg_data["id"],
+        thread_id=msg_data["threadId"],
+        subject=html.unescape(subject) if subject else "(No subject)",
+        sender=sender_name,
+        sender_email=sender_email,
+        recipient=to_header,
+        date=date,
+        snippet=snippet,
+        labels=msg_data.get("labelIds", []),
+        is_unread="UNREAD" in msg_data.get("labelIds", []),
+        payload=msg_data["payload"],
+    )
+
+
+def list_messages(
+    service, query: str, max_results: int, label_ids: Optional[list[str]] = None
+) -> list[dict]:
+    """List message IDs matching a query, following pagination.
+
+    Args:
+        service: Authenticated Gmail API service
+        query: Gmail search query
+        max_results: Maximum number of messages to return across all pages
+        label_ids: Only list messages carrying all of these label IDs
+
+    Returns:
+        List of Gmail message stubs with "id" and "threadId"
+    """
+    messages: list[dict] = []
+    page_token = None
+
+    while len(messages) < max_results:
+        results = (
+            service.users()
+            .messages()
+            .list(
+                userId="me",
+                q=query,
+                labelIds=label_ids,
+                maxResults=min(MAX_PAGE_SIZE, max_results - len(messages)),
+                pageToken=page_token,
+            )
+            .execute()
+        )
+        messages.extend(results.get("messages", []))
+
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+
+    return messages[:max_results]
+
+
+def list_history_messages(
+    service, start_history_id: str, unread_only: bool = True, labels: Optional[list[str]] = None
+) -> list[dict]:
+    """List messages added to the mailbox since a history ID, following pagination.
+
+    History records are not filtered server-side, so every page is read and
+    messages whose labels at the time they were added already fail the
+    filters (sent mail, drafts, already-read mail) are dropped here. The
+    result is not capped; callers take the oldest matches and resume from
+    the history ID of the last one they used.
+
+    Args:
+        service: Authenticated Gmail API service
+        start_history_id: History ID saved from a previous run
+        unread_only: Drop messages that were not unread when added
+        labels: Drop messages missing any of these label IDs when added
+
+    Returns:
+        List of Gmail message stubs, oldest first, each with the "historyId"
+        of the history record that added it
+
+    Raises:
+        HttpError: With status 404 if start_history_id is too old to replay
+    """
+    messages: list[dict] = []
+    seen: set[str] = set()
+    page_token = None
+
+    while True:
+        results = (
+            service.users()
+            .history()
+            .list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded"],
+                maxResults=MAX_PAGE_SIZE,
+                pageToken=page_token,
+            )
+            .execute()
+        )
+        for record in results.get("history", []):
+            for added in record.get("messagesAdded", []):
+                message = added["message"]
+                if message["id"] in seen:
+                    continue
+                seen.add(message["id"])
+                if "labelIds" in message and not matches_filters(message["labelIds"], unread_only, labels):
+                    continue
+                messages.append({**message, "historyId": record["id"]})
+
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+
+    return messages
+
+
+def get_current_history_id() -> str:
+    """Get the mailbox's current history ID.
+
+    Saving this before a fetch gives the starting point for the next
+    incremental sync with list_history_messages.
+
+    Returns:
+        Gmail history ID
+    """
+    service = get_gmail_service()
+    return service.users().getProfile(userId="me").execute()["historyId"]
+
+
+def matches_filters(label_ids: list[str], unread_only: bool, labels: Optional[list[str]]) -> bool:
+    """Check a message's labels against the filters a date query applies server-side.
+
+    Args:
+        label_ids: Label IDs carried by the message
+        unread_only: Only accept unread messages
+        labels: Labels the message must all carry
+
+    Returns:
+        True if the message passes all filters
+    """
+    if EXCLUDED_LABELS.intersection(label_ids):
+        return False
+    if unread_only and "UNREAD" not in label_ids:
+        return False
+    return all(label in label_ids for label in labels or [])
+
+
+def is_retryable(error: HttpError) -> bool:
+    """Check whether a Gmail API error is transient and worth retrying.
+
+    Args:
+        error: Error returned for a request or batch sub-request
+
+    Returns:
+        True for rate limiting and server errors
     """
-    for header in headers:
-        if header["name"].lower() == name.lower():
-            return header["value"]
-    return ""
+    status = error.resp.status
+    if status == 429 or status >= 500:
+        return True
+
+    if status != 403:
+        return False
 
+    # Gmail also reports per-user rate limits as 403. HttpError.error_details
+    # only exposes one of "details" and "errors", so read both from the body.
+    try:
+        body = json.loads(error.content).get("error", {})
+    except (ValueError, AttributeError):
+        return False
+    entries = body.get("errors", []) + body.get("details", [])
+    reasons = {entry.get("reason") for entry in entries if isinstance(entry, dict)}
+    return bool(reasons & RATE_LIMIT_REASONS)
 
-def get_email_body(payload: dict) -> str:
-    """Extract email body from Gmail message payload.
+
+def fetch_batch(service, message_ids: list[str], get_params: dict) -> dict[str, Email]:
+    """Fetch one batch of messages, retrying throttled sub-requests with backoff.
 
     Args:
-        payload: Gmail message payload
+        service: Authenticated Gmail API service owned by the calling thread
+        message_ids: Gmail message IDs to fetch, at most BATCH_SIZE
+        get_params: Extra parameters for messages().get()
 
     Returns:
-        Email body text (plain text preferred, HTML if no plain text)
+        Dict mapping message ID to parsed Email; deleted messages are omitted
+
+    Raises:
+        HttpError: For non-retryable errors, or once MAX_RETRIES is exhausted
     """
-    body = ""
+    fetched: dict[str, Email] = {}
+    pending = message_ids
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry: list[str] = []
+        last_error: Optional[HttpError] = None
+
+        def collect(request_id: str, response: dict, exception: Optional[Exception]) -> None:
+            nonlocal last_error
+            if exception is None:
+                fetched[request_id] = parse_message(response)
+            elif isinstance(exception, HttpError) and exception.resp.status == 404:
+                return  # Message was deleted after it was listed
+            elif isinstance(exception, HttpError) and is_retryable(exception):
+                retry.append(request_id)
+                last_error = exception
+            else:
+                raise exception
+
+        batch = service.new_batch_http_request(callback=collect)
+        for message_id in pending:
+            batch.add(
+                service.users().messages().get(userId="me", id=message_id, **get_params),
+                request_id=message_id,
+            )
+
+        try:
+            batch.execute()
+        except HttpError as e:
+            # The whole batch request was rejected; retry everything not yet fetched
+            if not is_retryable(e):
+                raise
+            retry = [message_id for message_id in pending if message_id not in fetched]
+            last_error = e
+
+        if not retry:
+            return fetched
+        if attempt == MAX_RETRIES:
+            raise last_error
+
+        delay = RETRY_BASE_DELAY * 2**attempt + random.uniform(0, RETRY_BASE_DELAY)
+        logging.warning("Retrying %d throttled message(s) in %.1fs", len(retry), delay)
+        time.sleep(delay)
+        pending = retry
+
+    return fetched
+
+
+def fetch_message_details(
+    creds: Credentials, message_ids: list[str], fetch_body: bool = False
+) -> Iterator[list[Email]]:
+    """Fetch and parse message details concurrently, one batch at a time.
+
+    Message IDs are split into batch requests of BATCH_SIZE, and batches
+    are executed across a small thread pool. Each worker thread builds its own
+    Gmail service since the underlying HTTP client is not thread-safe.
+    Throttled sub-requests are retried with backoff by fetch_batch.
 
-    # Check if payload has body data
-    if "body" in payload and "data" in payload["body"]:
-        body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8")
-        return body
+    Args:
+        creds: Valid Google OAuth2 credentials
+        message_ids: Gmail message IDs to fetch
+        fetch_body: Fetch full messages including bodies instead of headers only
 
-    # Check for multipart message
-    if "parts" in payload:
-        for part in payload["parts"]:
-            mime_type = part.get("mimeType", "")
+    Yields:
+        Parsed Emails for each batch, in message_ids order; deleted messages are omitted
+    """
+    local = threading.local()
 
-            # Prefer plain text
-            if mime_type == "text/plain" and "data" in part.get("body", {}):
-                body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
-                return body
+    # Bodies are only sent by Gmail in full format; metadata is much smaller
+    if fetch_body:
+        get_params = {"format": "full"}
+    else:
+        get_params = {"format": "metadata", "metadataHeaders": METADATA_HEADERS, "fields": METADATA_FIELDS}
 
-            # Fallback to HTML
-            if mime_type == "text/html" and "data" in part.get("body", {}):
-                body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+    def execute_batch(chunk: list[str]) -> list[Email]:
+        if not hasattr(local, "service"):
+            local.service = build_gmail_service(creds)
 
-            # Recursively check nested parts
-            if "parts" in part:
-                nested_body = get_email_body(part)
-                if nested_body:
-                    return nested_body
+        fetched = fetch_batch(local.service, chunk, get_params)
 
-    return body
+        # Batch responses may arrive in any order
+        return [fetched[message_id] for message_id in chunk if message_id in fetched]
+
+    chunks = [message_ids[start : start + BATCH_SIZE] for start in range(0, len(message_ids), BATCH_SIZE)]
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        futures = [executor.submit(execute_batch, chunk) for chunk in chunks]
+        for future in futures:
+            # Waits for this batch only; re-raises any error from the worker thread
+            yield future.result()
+    finally:
+        # Drop batches not started yet if the caller stopped early
+        executor.shutdown(cancel_futures=True)
 
 
 def fetch_emails(
@@ -150,7 +461,9 @@ def fetch_emails(
     unread_only: bool = True,
     labels: Optional[list[str]] = None,
     max_results: int = 100,
-) -> list[Email]:
+    fetch_body: bool = False,
+    start_history_id: Optional[str] = None,
+) -> Iterator[Email]:
     """Fetch emails from Gmail based on filters.
 
     Args:
@@ -158,11 +471,16 @@ def fetch_emails(
         before: Fetch emails before this date
         days: Fetch emails from last N days
         unread_only: Only fetch unread emails (default: True)
-        labels: Filter by Gmail labels
-        max_results: Maximum number of emails to fetch (default: 100)
+        labels: Filter by Gmail label IDs (e.g., ['INBOX', 'IMPORTANT'])
+        max_results: Maximum number of emails to fetch across all pages (default: 100)
+        fetch_body: Also fetch message bodies, decoded on first Email.body access (default: False)
+        start_history_id: Fetch exactly the messages added since this history ID,
+            falling back to the date query if Gmail no longer has that history.
+            Messages are then yielded oldest first, each with its history_id set,
+            so a caller that stops at max_results can resume after the last one
 
-    Returns:
-        List of Email objects
+    Yields:
+        Email objects in list order, as each batch of details arrives
 
     Example:
         >>> # Fetch unread emails from last 7 days
@@ -170,73 +488,64 @@ def fetch_emails(
         >>> for email in emails:
         ...     print(f"{email.subject} from {email.sender}")
     """
+    creds = get_credentials()
     service = get_gmail_service()
 
-    # Build query
-    query = build_query(after=after, before=before, days=days, unread_only=unread_only, labels=labels)
-    print(f"Gmail query: {query}")
+    messages = None
+    if start_history_id:
+        try:
+            messages = list_history_messages(service, start_history_id, unread_only, labels)
+            print(f"Fetching messages added since history ID {start_history_id}")
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            print("Saved history ID has expired, falling back to date query.")
 
-    # Fetch message IDs
-    results = service.users().messages().list(userId="me", q=query, maxResults=max_results).execute()
+    use_history = messages is not None
+    if not use_history:
+        # Build query
+        query = build_query(after=after, before=before, days=days, unread_only=unread_only)
+        print(f"Gmail query: {query}")
 
-    messages = results.get("messages", [])
+        messages = list_messages(service, query, max_results, labels)
 
     if not messages:
         print("No messages found matching the criteria.")
-        return []
+        return
 
-    print(f"Found {len(messages)} messages. Fetching details...")
+    if use_history:
+        # Labels are re-checked after fetching, so fewer may be shown
+        print(f"Found {len(messages)} candidate message(s) in history. Fetching details...")
+        history_ids = {msg["id"]: msg["historyId"] for msg in messages}
+    else:
+        print(f"Found {len(messages)} messages. Fetching details...")
 
-    # Fetch full message details
-    emails = []
     filtered_count = 0
-    for msg in messages:
-        msg_data = service.users().messages().get(userId="me", id=msg["id"], format="full").execute()
-
-        # Parse headers
-        headers = msg_data["payload"]["headers"]
-        subject = get_header_value(headers, "Subject")
-        from_header = get_header_value(headers, "From")
-        to_header = get_header_value(headers, "To")
-        date_header = get_header_value(headers, "Date")
-
-        # Parse sender info
-        sender_name, sender_email = parse_email_address(from_header)
-
-        # Parse date
-        date = parsedate_to_datetime(date_header) if date_header else datetime.now()
-
-        # Client-side filtering: Gmail's "after:" filter is date-only, not datetime
-        # So we need to filter by exact timestamp on the client side
-        if after:
-            # Normalize both datetimes to naive (remove timezone info) for comparison
-            # Gmail dates are timezone-aware, but our stored timestamp is naive
-            date_naive = date.replace(tzinfo=None) if date.tzinfo else date
-            if date_naive <= after:
-                filtered_count += 1
-                continue  # Skip emails at or before the cutoff time
-
-        # Get body and snippet, decode HTML entities
-        body = html.unescape(get_email_body(msg_data["payload"]))
-        snippet = html.unescape(msg_data.get("snippet", ""))
-
-        # Create Email object
-        email = Email(
-            id=msg_data["id"],
-            thread_id=msg_data["threadId"],
-            subject=html.unescape(subject) if subject else "(No subject)",
-            sender=sender_name,
-            sender_email=sender_email,
-            recipient=to_header,
-            date=date,
-            snippet=snippet,
-            body=body,
-            labels=msg_data.get("labelIds", []),
-            is_unread="UNREAD" in msg_data.get("labelIds", []),
-        )
-        emails.append(email)
+    yielded = 0
+    for batch in fetch_message_details(creds, [msg["id"] for msg in messages], fetch_body):
+        for email in batch:
+            # Labels may have changed since the history record (e.g. mail read
+            # since), so re-check them; stop once max_results oldest matches are out
+            if use_history:
+                if matches_filters(email.labels, unread_only, labels):
+                    email.history_id = history_ids[email.id]
+                    yield email
+                    yielded += 1
+                    if yielded >= max_results:
+                        return
+                continue
+
+            # Client-side filtering: Gmail's "after:" filter is date-only, not datetime
+            # So we need to filter by exact timestamp on the client side
+            if after:
+                # Normalize both datetimes to naive (remove timezone info) for comparison
+                # Gmail dates are timezone-aware, but our stored timestamp is naive
+                date_naive = email.date.replace(tzinfo=None) if email.date.tzinfo else email.date
+                if date_naive <= after:
+                    filtered_count += 1
+                    continue  # Skip emails at or before the cutoff time
+
+            yield email
 
     if filtered_count > 0:
         print(f"Filtered out {filtered_count} already-seen email(s) based on timestamp")
-
-    return emails
@@ -1,9 +1,13 @@
 """Email data models for structured email representation."""
 
-from dataclasses import dataclass
+import html
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import cached_property
 from typing import Optional
 
+from src.email.body import get_email_body
+
 
 @dataclass
 class Email:
@@ -17,9 +21,20 @@ class Email:
     recipient: str
     date: datetime
     snippet: str
-    body: str
     labels: list[str]
     is_unread: bool
+    # History record that added the message; only set by history-based fetches
+    history_id: Optional[str] = None
+    # Raw Gmail payload, kept so the body is only decoded if it is read
+    payload: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @cached_property
+    def body(self) -> str:
+        """Email body text, decoded from the payload on first access.
+
+        Empty unless the message was fetched with fetch_body=True.
+        """
+        return html.unescape(get_email_body(self.payload))
 
     def __str__(self) -> str:
         """Human-readable string representation."""
@@ -1,5 +1,5 @@
 """Utility modules."""
 
-from src.utils.state import get_last_run, reset_last_run, save_last_run
+from src.utils.state import TIMESTAMP_FORMAT, get_last_history_id, get_last_run, reset_last_run, save_last_run
 
-__all__ = ["get_last_run", "save_last_run", "reset_last_run"]
+__all__ = ["TIMESTAMP_FORMAT", "get_last_run", "get_last_history_id", "save_last_run", "reset_last_run"]
@@ -1,13 +1,39 @@
-"""State management for tracking last run timestamps."""
+"""State management for tracking last run timestamps and Gmail history IDs."""
 
-import json
 import os
 from datetime import datetime
-from pathlib import Path
 from typing import Optional
 
 
-STATE_FILE = ".last_run.json"
+# Display format for run timestamps
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Holds the last run as a bare epoch timestamp, e.g. "1760512345.123"
+STATE_FILE = ".last_run"
+
+# Holds the Gmail history ID captured at the last run, for incremental sync
+HISTORY_FILE = ".history_id"
+
+# JSON state file written by earlier versions; still read for one release
+LEGACY_STATE_FILE = ".last_run.json"
+
+
+def read_legacy_last_run() -> Optional[float]:
+    """Read the last run epoch timestamp from the legacy JSON state file.
+
+    Returns:
+        Epoch timestamp, or None if the file is missing or invalid
+    """
+    import json
+
+    if not os.path.exists(LEGACY_STATE_FILE):
+        return None
+
+    try:
+        with open(LEGACY_STATE_FILE, "r") as f:
+            return json.load(f).get("last_run")
+    except (json.JSONDecodeError, AttributeError):
+        return None
 
 
 def get_last_run() -> Optional[datetime]:
@@ -16,42 +42,81 @@ def get_last_run() -> Optional[datetime]:
     Returns:
         datetime of last run, or None if never run before
     """
-    if not os.path.exists(STATE_FILE):
-        return None
-
     try:
         with open(STATE_FILE, "r") as f:
-            data = json.load(f)
-            timestamp = data.get("last_run")
-            if timestamp:
-                return datetime.fromtimestamp(timestamp)
-    except (json.JSONDecodeError, KeyError, ValueError):
+            timestamp = float(f.read())
+    except FileNotFoundError:
+        timestamp = read_legacy_last_run()
+    except ValueError:
         return None
 
+    if timestamp:
+        try:
+            return datetime.fromtimestamp(timestamp)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return None
+
     return None
 
 
-def save_last_run(timestamp: Optional[datetime] = None) -> None:
+def get_last_history_id() -> Optional[str]:
+    """Get the Gmail history ID saved at the last run.
+
+    Returns:
+        History ID, or None if none was saved
+    """
+    try:
+        with open(HISTORY_FILE, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_atomic(path: str, content: str) -> None:
+    """Write a file atomically so a crash never leaves it half-written.
+
+    The data is fsynced before the rename so the new file survives a crash
+    on filesystems that may reorder the rename ahead of the data.
+
+    Args:
+        path: File to write
+        content: Full new file contents
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_last_run(timestamp: Optional[datetime] = None, history_id: Optional[str] = None) -> None:
     """Save the last run timestamp.
 
     Args:
         timestamp: Timestamp to save (defaults to now)
+        history_id: Gmail history ID to resume from on the next run
     """
     if timestamp is None:
         timestamp = datetime.now()
 
-    data = {"last_run": timestamp.timestamp(), "last_run_readable": timestamp.isoformat()}
+    write_atomic(STATE_FILE, f"{timestamp.timestamp()}")
 
-    with open(STATE_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+    if history_id:
+        write_atomic(HISTORY_FILE, str(history_id))
 
-    print(f"✓ Saved last run: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"✓ Saved last run: {timestamp.strftime(TIMESTAMP_FORMAT)}")
 
 
 def reset_last_run() -> None:
-    """Reset the last run timestamp (delete state file)."""
-    if os.path.exists(STATE_FILE):
-        os.remove(STATE_FILE)
+    """Reset the last run timestamp and history ID (delete state files)."""
+    removed = False
+    for path in (STATE_FILE, HISTORY_FILE, LEGACY_STATE_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+
+    if removed:
         print(f"✓ Reset last run timestamp")
     else:
         print("No state file to reset")
@@ -0,0 +1,60 @@
+"""Tests for Gmail message body extraction."""
+
+import base64
+
+from src.email.body import get_email_body
+
+
+def encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def part(mime_type: str, text: str) -> dict:
+    return {"mimeType": mime_type, "body": {"data": encode(text)}}
+
+
+def test_single_part_body():
+    assert get_email_body({"mimeType": "text/plain", "body": {"data": encode("hello")}}) == "hello"
+
+
+def test_prefers_nested_plain_over_earlier_html():
+    payload = {
+        "mimeType": "multipart/mixed",
+        "body": {"size": 0},
+        "parts": [
+            part("text/html", "<p>html</p>"),
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [
+                    {"mimeType": "multipart/related", "parts": [part("text/plain", "deep plain")]},
+                    part("text/plain", "later plain"),
+                ],
+            },
+        ],
+    }
+
+    assert get_email_body(payload) == "deep plain"
+
+
+def test_falls_back_to_first_html():
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {"mimeType": "multipart/alternative", "parts": [part("text/html", "first")]},
+            part("text/html", "second"),
+            {"mimeType": "application/pdf", "body": {"attachmentId": "a1", "size": 10}},
+        ],
+    }
+
+    assert get_email_body(payload) == "first"
+
+
+def test_empty_payload():
+    assert get_email_body({"mimeType": "multipart/mixed", "parts": []}) == ""
+    assert get_email_body({"headers": []}) == ""
+
+
+def test_invalid_utf8_is_replaced():
+    data = base64.urlsafe_b64encode(b"caf\xe9").decode("ascii")
+
+    assert get_email_body({"body": {"data": data}}) == "caf�"
@@ -0,0 +1,55 @@
+"""Tests for loading stored Gmail credentials."""
+
+import io
+import json
+import pickle
+import sys
+
+import pytest
+
+from src.auth import gmail_auth
+from src.auth.gmail_auth import SCOPES, get_credentials
+
+AUTHORIZED_USER = {
+    "token": "access-token",
+    "refresh_token": "refresh-token",
+    "client_id": "client-id",
+    "client_secret": "client-secret",
+    "scopes": SCOPES,
+    "expiry": "2099-01-01T00:00:00Z",
+}
+
+
+@pytest.fixture
+def token_file(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "token.json"
+    monkeypatch.setenv("TOKEN_FILE", str(path))
+    get_credentials.cache_clear()
+    yield path
+    get_credentials.cache_clear()
+
+
+def test_get_credentials_loads_json_token(token_file):
+    token_file.write_text(json.dumps(AUTHORIZED_USER))
+
+    creds = get_credentials()
+
+    assert creds.valid
+    assert creds.token == "access-token"
+    assert creds.refresh_token == "refresh-token"
+    # Cached for the rest of the process
+    assert get_credentials() is creds
+
+
+def test_get_credentials_refuses_legacy_token_without_tty(monkeypatch, token_file):
+    token_file.write_bytes(pickle.dumps({"token": "access-token"}))
+    monkeypatch.setattr(sys, "stdin", io.StringIO())
+
+    def fail(*args):
+        raise AssertionError("OAuth flow must not start without a TTY")
+
+    monkeypatch.setattr(gmail_auth, "find_credentials_file", fail)
+
+    with pytest.raises(RuntimeError, match="could not be read"):
+        get_credentials()
@@ -0,0 +1,323 @@
+"""Tests for the Gmail client, with the Gmail API service mocked."""
+
+import json
+from datetime import datetime
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from src.email import gmail_client
+from src.email.gmail_client import (
+    fetch_batch,
+    fetch_emails,
+    fetch_message_details,
+    is_retryable,
+    list_history_messages,
+    list_messages,
+    matches_filters,
+    parse_email_address,
+)
+
+
+def http_error(status: int, reason: str = "", details: tuple[dict, ...] = ()) -> HttpError:
+    error = {"code": status, "message": "error", "errors": [{"reason": reason}] if reason else []}
+    if details:
+        error["details"] = list(details)
+    return HttpError(httplib2.Response({"status": status}), json.dumps({"error": error}).encode())
+
+
+def make_message(message_id: str, labels: tuple[str, ...] = ("INBOX", "UNREAD")) -> dict:
+    return {
+        "id": message_id,
+        "threadId": f"t-{message_id}",
+        "snippet": f"snippet {message_id}",
+        "labelIds": list(labels),
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": f"Subject {message_id}"},
+                {"name": "From", "value": "Jane Doe <jane@example.com>"},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Date", "value": "Sun, 01 Jun 2025 12:00:00 +0000"},
+            ]
+        },
+    }
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self):
+        return self.run()
+
+
+class FakeBatch:
+    """Runs sub-requests in reverse order, since Gmail does not preserve order."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in reversed(self.requests):
+            try:
+                response = request.execute()
+            except HttpError as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
+
+
+class FakeService:
+    """Minimal stand-in for the googleapiclient Gmail service."""
+
+    def __init__(self, messages=(), list_pages=None, history_pages=None, history_error=None, failures=None):
+        self.messages_by_id = {message["id"]: message for message in messages}
+        self.list_pages = list_pages or {None: {}}
+        self.history_pages = history_pages or {None: {}}
+        self.history_error = history_error
+        # Message ID -> statuses to fail with before succeeding
+        self.failures = failures or {}
+        self.list_calls = []
+        self.get_calls = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return FakeHistory(self)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(callback)
+
+    def list(self, **kwargs):
+        self.list_calls.append(kwargs)
+        return FakeRequest(lambda: self.list_pages[kwargs.get("pageToken")])
+
+    def get(self, userId, id, **params):
+        self.get_calls.append(id)
+        return FakeRequest(lambda: self.get_message(id))
+
+    def get_message(self, message_id):
+        if self.failures.get(message_id):
+            raise http_error(self.failures[message_id].pop(0))
+        if message_id not in self.messages_by_id:
+            raise http_error(404)
+        return self.messages_by_id[message_id]
+
+
+class FakeHistory:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **kwargs):
+        def run():
+            if self.service.history_error:
+                raise self.service.history_error
+            return self.service.history_pages[kwargs.get("pageToken")]
+
+        return FakeRequest(run)
+
+
+def history_page(messages: list[dict], first_history_id: int = 101, next_page_token=None) -> dict:
+    """Build a history().list page with one messageAdded record per message."""
+    page = {
+        "history": [
+            {"id": str(first_history_id + i), "messagesAdded": [{"message": message}]}
+            for i, message in enumerate(messages)
+        ]
+    }
+    if next_page_token:
+        page["nextPageToken"] = next_page_token
+    return page
+
+
+def stub(message: dict) -> dict:
+    return {"id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}
+
+
+@pytest.fixture
+def use_service(monkeypatch):
+    def install(service: FakeService) -> FakeService:
+        monkeypatch.setattr(gmail_client, "get_credentials", lambda: None)
+        monkeypatch.setattr(gmail_client, "get_gmail_service", lambda: service)
+        monkeypatch.setattr(gmail_client, "build_gmail_service", lambda creds: service)
+        return service
+
+    return install
+
+
+def test_list_messages_follows_pages_up_to_max_results():
+    pages = {
+        None: {"messages": [{"id": "m1"}, {"id": "m2"}, {"id": "m3"}], "nextPageToken": "p2"},
+        "p2": {"messages": [{"id": "m4"}, {"id": "m5"}], "nextPageToken": "p3"},
+        "p3": {"messages": [{"id": "m6"}]},
+    }
+    service = FakeService(list_pages=pages)
+
+    messages = list_messages(service, "is:unread", max_results=5, label_ids=["INBOX"])
+
+    assert [message["id"] for message in messages] == ["m1", "m2", "m3", "m4", "m5"]
+    assert [call["pageToken"] for call in service.list_calls] == [None, "p2"]
+    assert [call["maxResults"] for call in service.list_calls] == [5, 2]
+    assert service.list_calls[0]["labelIds"] == ["INBOX"]
+
+
+def test_list_messages_stops_without_next_page_token():
+    service = FakeService(list_pages={None: {"messages": [{"id": "m1"}]}})
+
+    assert list_messages(service, "", max_results=100) == [{"id": "m1"}]
+    assert len(service.list_calls) == 1
+
+
+def test_fetch_message_details_restores_order_and_skips_deleted(monkeypatch, use_service):
+    monkeypatch.setattr(gmail_client, "BATCH_SIZE", 2)
+    service = use_service(FakeService(messages=[make_message(f"m{i}") for i in range(5) if i != 2]))
+
+    batches = list(fetch_message_details(None, [f"m{i}" for i in range(5)]))
+
+    assert [[email.id for email in batch] for batch in batches] == [["m0", "m1"], ["m3"], ["m4"]]
+    assert sorted(service.get_calls) == [f"m{i}" for i in range(5)]
+
+
+def test_fetch_batch_retries_throttled_messages(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(gmail_client.time, "sleep", sleeps.append)
+    service = FakeService(messages=[make_message("m1"), make_message("m2")], failures={"m2": [429, 503]})
+
+    fetched = fetch_batch(service, ["m1", "m2"], {})
+
+    assert set(fetched) == {"m1", "m2"}
+    assert service.get_calls == ["m1", "m2", "m2", "m2"]
+    assert len(sleeps) == 2
+
+
+def test_fetch_batch_raises_non_retryable_errors():
+    service = FakeService(messages=[make_message("m1")], failures={"m1": [400]})
+
+    with pytest.raises(HttpError):
+        fetch_batch(service, ["m1"], {})
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (http_error(429), True),
+        (http_error(503), True),
+        (http_error(403, "userRateLimitExceeded"), True),
+        # google.rpc details take precedence over "errors" in HttpError.error_details
+        (
+            http_error(
+                403,
+                "rateLimitExceeded",
+                details=({"@type": "type.googleapis.com/google.rpc.ErrorInfo", "reason": "RATE_LIMIT_EXCEEDED"},),
+            ),
+            True,
+        ),
+        (http_error(403, "forbidden"), False),
+        (http_error(400), False),
+        (http_error(404), False),
+    ],
+)
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_parse_email_address_handles_malformed_headers():
+    assert parse_email_address("John Doe <john@example.com>") == ("John Doe", "john@example.com")
+    assert parse_email_address("jane@example.com") == ("jane@example.com", "jane@example.com")
+    assert parse_email_address("Doe, John <john@x.com>") == ("Doe, John", "john@x.com")
+    assert parse_email_address("=?UTF-8?B?SsO2cmc=?= <j@x.com>") == ("Jörg", "j@x.com")
+    assert parse_email_address("=?x-bogus?q?abc?= <a@x.com>") == ("=?x-bogus?q?abc?=", "a@x.com")
+    assert parse_email_address("=?UTF-8?B?w6lsw6?= <a@x.com>") == ("=?UTF-8?B?w6lsw6?=", "a@x.com")
+
+
+def test_matches_filters():
+    assert matches_filters(["INBOX", "UNREAD"], unread_only=True, labels=["INBOX"])
+    assert not matches_filters(["INBOX"], unread_only=True, labels=None)
+    assert matches_filters(["INBOX"], unread_only=False, labels=None)
+    assert not matches_filters(["UNREAD"], unread_only=True, labels=["INBOX"])
+    assert not matches_filters(["SPAM", "UNREAD"], unread_only=False, labels=None)
+
+
+def test_list_history_messages_filters_and_keeps_oldest_first():
+    added = [make_message(f"m{i}") for i in range(4)]
+    added[1]["labelIds"] = ["SENT"]
+    pages = {
+        None: history_page([stub(message) for message in added[:2]], next_page_token="p2"),
+        # Label changes can repeat a message; it should only be listed once
+        "p2": history_page([stub(message) for message in added[2:]] + [stub(added[0])], first_history_id=103),
+    }
+    service = FakeService(history_pages=pages)
+
+    messages = list_history_messages(service, "100", unread_only=True)
+
+    assert [(message["id"], message["historyId"]) for message in messages] == [
+        ("m0", "101"),
+        ("m2", "103"),
+        ("m3", "104"),
+    ]
+
+
+def test_fetch_emails_history_yields_oldest_matches_up_to_max_results(use_service):
+    added = [make_message(f"m{i}") for i in range(10)]
+    added[1]["labelIds"] = ["SENT"]
+    history = history_page([stub(message) for message in added])
+    # Unread when added but read since; only the fetched labels reveal it
+    added[2]["labelIds"] = ["INBOX"]
+    use_service(FakeService(messages=added, history_pages={None: history}))
+
+    emails = list(fetch_emails(after=datetime(2025, 1, 1), max_results=3, start_history_id="100"))
+
+    assert [(email.id, email.history_id) for email in emails] == [("m0", "101"), ("m3", "104"), ("m4", "105")]
+
+
+def test_fetch_emails_history_resumes_after_last_shown(use_service):
+    added = [make_message(f"m{i}") for i in range(3)]
+    pages = {None: history_page([stub(message) for message in added])}
+    use_service(FakeService(messages=added, history_pages=pages))
+
+    first = list(fetch_emails(max_results=2, start_history_id="100"))
+    # Gmail only returns records after startHistoryId
+    pages[None] = history_page([stub(added[2])], first_history_id=103)
+    second = list(fetch_emails(max_results=2, start_history_id=first[-1].history_id))
+
+    assert [email.id for email in first + second] == ["m0", "m1", "m2"]
+
+
+def test_fetch_emails_history_reports_candidates(use_service, capsys):
+    added = [make_message(f"m{i}") for i in range(3)]
+    use_service(FakeService(messages=added, history_pages={None: history_page([stub(m) for m in added])}))
+
+    list(fetch_emails(max_results=2, start_history_id="100"))
+
+    assert "Found 3 candidate message(s) in history" in capsys.readouterr().out
+
+
+def test_fetch_emails_falls_back_to_date_query_when_history_expired(use_service):
+    service = use_service(
+        FakeService(
+            messages=[make_message("m1")],
+            list_pages={None: {"messages": [{"id": "m1"}]}},
+            history_error=http_error(404),
+        )
+    )
+
+    emails = list(fetch_emails(after=datetime(2025, 1, 1), start_history_id="100"))
+
+    assert [email.id for email in emails] == ["m1"]
+    assert service.list_calls[0]["q"] == "is:unread after:2025/01/01"
+
+
+def test_fetch_emails_raises_other_history_errors(use_service):
+    use_service(FakeService(history_error=http_error(500)))
+
+    with pytest.raises(HttpError):
+        list(fetch_emails(start_history_id="100"))
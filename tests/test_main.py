@@ -0,0 +1,114 @@
+"""Tests for the fetch command, with Gmail access mocked."""
+
+from datetime import datetime
+
+import pytest
+from click.testing import CliRunner
+
+import src.email
+from main import cli
+from src.email import Email
+from src.utils import get_last_history_id, get_last_run, save_last_run
+
+
+def make_email(message_id: str, history_id=None) -> Email:
+    return Email(
+        id=message_id,
+        thread_id=f"t-{message_id}",
+        subject=f"Subject {message_id}",
+        sender="Jane Doe",
+        sender_email="jane@example.com",
+        recipient="me@example.com",
+        date=datetime(2025, 6, 1, 12, 0),
+        snippet=f"snippet {message_id}",
+        labels=["INBOX", "UNREAD"],
+        is_unread=True,
+        history_id=history_id,
+    )
+
+
+@pytest.fixture
+def gmail(monkeypatch, tmp_path):
+    """Run in a scratch directory and serve the given emails instead of Gmail."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(src.email, "get_current_history_id", lambda: "900")
+
+    def install(emails):
+        calls = []
+
+        def fake_fetch_emails(**kwargs):
+            calls.append(kwargs)
+            yield from emails
+
+        monkeypatch.setattr(src.email, "fetch_emails", fake_fetch_emails)
+        return calls
+
+    return install
+
+
+def test_fetch_resumes_history_after_last_shown_email_at_max(gmail):
+    last_run = datetime(2025, 6, 1, 8, 0)
+    save_last_run(last_run, "100")
+    calls = gmail([make_email("m1", "101"), make_email("m2", "105")])
+
+    result = CliRunner().invoke(cli, ["fetch", "--no-interactive", "--max", "2"])
+
+    assert result.exit_code == 0
+    assert calls[0]["start_history_id"] == "100"
+    assert "the next run continues after the last email shown" in result.output
+    assert get_last_history_id() == "105"
+    assert get_last_run() == last_run
+
+
+def test_fetch_saves_current_history_id_below_max(gmail):
+    save_last_run(datetime(2025, 6, 1, 8, 0), "100")
+    gmail([make_email("m1", "101")])
+
+    result = CliRunner().invoke(cli, ["fetch", "--no-interactive", "--max", "2"])
+
+    assert result.exit_code == 0
+    assert "Reached --max" not in result.output
+    assert get_last_history_id() == "900"
+    assert get_last_run() > datetime(2025, 6, 1, 8, 0)
+
+
+def test_fetch_warns_that_date_query_skipped_older_mail_at_max(gmail):
+    save_last_run(datetime(2025, 6, 1, 8, 0))
+    gmail([make_email("m1"), make_email("m2")])
+
+    result = CliRunner().invoke(cli, ["fetch", "--no-interactive", "--max", "2"])
+
+    assert "older matching emails, if any, were skipped" in result.output
+    assert get_last_history_id() == "900"
+
+
+def test_fetch_skips_prompts_when_stdin_is_not_a_tty(gmail):
+    calls = gmail([make_email("m1")])
+
+    # CliRunner stdin is not a TTY, so no --no-interactive is needed
+    result = CliRunner().invoke(cli, ["fetch"])
+
+    assert result.exit_code == 0
+    assert "How many days" not in result.output
+    assert "First run - fetching last 7 days" in result.output
+    assert calls[0]["days"] == 7
+    assert get_last_run() is not None
+
+
+def test_fetch_prints_each_email_as_it_arrives(gmail, monkeypatch, capsys):
+    gmail([])
+    seen = []
+
+    def streaming_fetch_emails(**kwargs):
+        yield make_email("m1")
+        # The first email must already be on screen before the next one is fetched
+        seen.append(capsys.readouterr().out)
+        yield make_email("m2")
+
+    monkeypatch.setattr(src.email, "fetch_emails", streaming_fetch_emails)
+
+    cli.main(["fetch", "--no-interactive", "--days", "1"], standalone_mode=False)
+
+    assert "[1] Subject m1" in seen[0]
+    assert "Subject m2" not in seen[0]
+    assert "[2] Subject m2" in capsys.readouterr().out
@@ -0,0 +1,51 @@
+"""Tests for the Email model."""
+
+import base64
+from datetime import datetime
+
+from src.email import models
+from src.email.models import Email
+
+
+def make_email(payload: dict) -> Email:
+    return Email(
+        id="m1",
+        thread_id="t1",
+        subject="Subject",
+        sender="Jane Doe",
+        sender_email="jane@example.com",
+        recipient="me@example.com",
+        date=datetime(2025, 6, 1, 12, 0),
+        snippet="snippet",
+        labels=["INBOX"],
+        is_unread=False,
+        payload=payload,
+    )
+
+
+def test_body_is_decoded_lazily_and_cached(monkeypatch):
+    calls = []
+
+    def fake_get_email_body(payload):
+        calls.append(payload)
+        return "Tom &amp; Jerry"
+
+    monkeypatch.setattr(models, "get_email_body", fake_get_email_body)
+    email = make_email({"body": {"data": "ignored"}})
+
+    assert calls == []
+    assert email.body == "Tom & Jerry"
+    assert email.body == "Tom & Jerry"
+    assert len(calls) == 1
+
+
+def test_body_decodes_payload():
+    data = base64.urlsafe_b64encode(b"hello").decode("ascii")
+
+    assert make_email({"mimeType": "text/plain", "body": {"data": data}}).body == "hello"
+    assert make_email({}).body == ""
+
+
+def test_payload_is_not_part_of_equality_or_repr():
+    assert make_email({"body": {}}) == make_email({})
+    assert "payload" not in repr(make_email({}))
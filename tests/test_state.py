@@ -0,0 +1,103 @@
+"""Tests for last run state files."""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from src.utils.state import (
+    HISTORY_FILE,
+    LEGACY_STATE_FILE,
+    STATE_FILE,
+    get_last_history_id,
+    get_last_run,
+    reset_last_run,
+    save_last_run,
+    write_atomic,
+)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_get_last_run_reads_epoch_timestamp():
+    with open(STATE_FILE, "w") as f:
+        f.write("1760512345.5")
+
+    assert get_last_run() == datetime.fromtimestamp(1760512345.5)
+
+
+def test_save_last_run_round_trips():
+    timestamp = datetime(2025, 6, 1, 8, 30, 15)
+
+    save_last_run(timestamp, "12345")
+
+    assert get_last_run() == timestamp
+    assert get_last_history_id() == "12345"
+
+
+@pytest.mark.parametrize("content", ["", "garbage", "1e400", "nan"])
+def test_get_last_run_ignores_invalid_state(content):
+    with open(STATE_FILE, "w") as f:
+        f.write(content)
+
+    assert get_last_run() is None
+
+
+def test_get_last_run_falls_back_to_legacy_json():
+    with open(LEGACY_STATE_FILE, "w") as f:
+        json.dump({"last_run": 1760512345.0}, f)
+
+    assert get_last_run() == datetime.fromtimestamp(1760512345.0)
+
+
+def test_get_last_run_ignores_invalid_legacy_json():
+    with open(LEGACY_STATE_FILE, "w") as f:
+        f.write("[not json")
+
+    assert get_last_run() is None
+
+
+def test_get_last_run_without_state():
+    assert get_last_run() is None
+    assert get_last_history_id() is None
+
+
+def test_reset_last_run_removes_all_state_files():
+    for path in (STATE_FILE, HISTORY_FILE, LEGACY_STATE_FILE):
+        with open(path, "w") as f:
+            f.write("1")
+
+    reset_last_run()
+
+    assert not any(os.path.exists(path) for path in (STATE_FILE, HISTORY_FILE, LEGACY_STATE_FILE))
+
+
+def test_write_atomic_replaces_file_without_leftovers(tmp_path):
+    with open(STATE_FILE, "w") as f:
+        f.write("old contents")
+
+    write_atomic(STATE_FILE, "123.0")
+
+    with open(STATE_FILE) as f:
+        assert f.read() == "123.0"
+    assert os.listdir(tmp_path) == [STATE_FILE]
+
+
+def test_write_atomic_keeps_old_file_when_write_fails(monkeypatch):
+    with open(STATE_FILE, "w") as f:
+        f.write("123.0")
+
+    def fail(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "fsync", fail)
+
+    with pytest.raises(OSError):
+        write_atomic(STATE_FILE, "456.0")
+
+    with open(STATE_FILE) as f:
+        assert f.read() == "123.0"